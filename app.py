@@ -4,31 +4,53 @@ import os
 import re
 import sqlite3
 import shutil
+import sys
+import time
+import unicodedata
+from collections import OrderedDict, deque
 from contextlib import contextmanager
 from datetime import datetime
-from functools import wraps
+from functools import cache, lru_cache, wraps
 from pathlib import Path
 import json
-from typing import Dict, Any, Iterable, Optional
+import mimetypes
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Any, Iterable, NamedTuple, Optional
 
 from flask import (
     Flask, request, jsonify, session, redirect, url_for,
-    render_template, render_template_string, flash, send_file, g
+    render_template, flash, send_file, g
 )
+from flask.json.provider import DefaultJSONProvider
+from urllib.parse import quote
 from werkzeug.utils import secure_filename
 
+try:
+    import orjson  # optional; much faster JSON encoding for API responses
+except ImportError:
+    orjson = None
+
 # ---- App config (pulled from caseorg_config.py) ------------------------
 try:
     import caseorg_config as config  # renamed to avoid clashing with Debian's 'config' module
 except Exception as e:
     raise RuntimeError("caseorg_config.py missing or invalid") from e
+import caseorg_extract  # judgment text extraction; also what extraction workers import
 
 
 FS_ROOT = Path(config.FS_ROOT).resolve() if getattr(config, "FS_ROOT", None) else None
+# String forms of FS_ROOT for hot paths; kept in sync by set_fs_root()
+FS_ROOT_STR = str(FS_ROOT) if FS_ROOT else ""
+FS_ROOT_PREFIX = os.path.join(FS_ROOT_STR, "") if FS_ROOT else ""  # with trailing sep
 ALLOWED_USERS = set(getattr(config, "ALLOWED_USERS", []))
 PASSWORD = getattr(config, "PASSWORD", None)  # <-- plain-text password from config
 SECRET_KEY = getattr(config, "SECRET_KEY", "dev-local-secret-key")
-ALLOWED_EXTENSIONS = set(getattr(config, "ALLOWED_EXTENSIONS", []))
+ALLOWED_EXTENSIONS = frozenset(getattr(config, "ALLOWED_EXTENSIONS", ()))
 
 
 CASE_LAW_ROOT_NAME = "Case Law"
@@ -47,16 +69,70 @@ CASE_LAW_CASE_TYPES = {
         "Trademark", "Copyright", "Patent", "Banking", "Others"
     ],
 }
+# lower-cased name -> canonical spelling, for case-insensitive form input
+_PRIMARY_TYPES_LC = {p.lower(): p for p in CASE_LAW_PRIMARY_TYPES}
+_CASE_TYPES_LC = {
+    primary: {t.lower(): t for t in types} for primary, types in CASE_LAW_CASE_TYPES.items()
+}
+
+
+# sendfile(2) between two regular files is Linux-only
+_SENDFILE_TO_FILE = sys.platform.startswith("linux") and hasattr(os, "sendfile")
+
+# Let a front-end proxy send file bodies instead of streaming them through
+# Python. CASEORG_ACCEL_PREFIX names an nginx `internal` location aliased to
+# FS_ROOT (e.g. "/protected/"); CASEORG_X_SENDFILE=1 turns on Apache/lighttpd
+# X-Sendfile via Flask's use_x_sendfile.
+ACCEL_REDIRECT_PREFIX = os.environ.get("CASEORG_ACCEL_PREFIX", "")
 
 
 # ---- Flask setup --------------------------------------------------------
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson (compact, keys unsorted)."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=self.default).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default), mimetype=self.mimetype
+        )
+
+
 app = Flask(__name__)
 app.secret_key = SECRET_KEY
+app.use_x_sendfile = os.environ.get("CASEORG_X_SENDFILE") == "1"
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+else:
+    app.json.sort_keys = False
 
 print("Running app.py from:", os.path.abspath(__file__))
 print("FS_ROOT:", FS_ROOT)
 
 # ---- Utilities ----------------------------------------------------------
+def set_fs_root(root: Path) -> None:
+    """Switch the storage root (already resolved) and its cached string forms."""
+    global FS_ROOT, FS_ROOT_STR, FS_ROOT_PREFIX
+    FS_ROOT = root
+    FS_ROOT_STR = str(root)
+    FS_ROOT_PREFIX = os.path.join(FS_ROOT_STR, "")
+
+
+def is_within_root(path) -> bool:
+    """True if the resolved `path` is FS_ROOT or lies below it.
+
+    Compares against the separator-terminated root, so a sibling such as
+    "<root>2/..." is not mistaken for a child of "<root>".
+    """
+    p = str(path)
+    return bool(FS_ROOT_PREFIX) and (p == FS_ROOT_STR or p.startswith(FS_ROOT_PREFIX))
+
+
 def ensure_root() -> None:
     """Create the storage root if configured."""
     if FS_ROOT:
@@ -79,6 +155,51 @@ def _case_law_db_file() -> Path:
     return root / CASE_LAW_DB_NAME
 
 
+# Fold diacritics (so "Cafe" finds "Café") and keep prefix indexes so "murd*"
+# style queries do not scan the whole term list.
+_CASE_LAW_FTS_TOKENIZE = "tokenize = 'unicode61 remove_diacritics 2'"
+_CASE_LAW_FTS_PREFIX = "prefix = '2 3 4'"
+
+
+def _case_law_fts_ddl(name: str) -> str:
+    return f"""
+        CREATE VIRTUAL TABLE {name} USING fts5(
+            content,
+            petitioner,
+            respondent,
+            citation,
+            note,
+            case_id UNINDEXED,
+            {_CASE_LAW_FTS_TOKENIZE},
+            {_CASE_LAW_FTS_PREFIX}
+        )
+        """
+
+
+def _rebuild_case_law_fts(conn: sqlite3.Connection) -> None:
+    """Re-create case_law_fts with the current tokenizer, keeping its rows.
+
+    The judgment text only lives in the FTS table, so rows are copied across
+    from the old table rather than rebuilt from case_law.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DROP TABLE IF EXISTS case_law_fts_new")
+        conn.execute(_case_law_fts_ddl("case_law_fts_new"))
+        conn.execute(
+            """
+            INSERT INTO case_law_fts_new(rowid, content, petitioner, respondent, citation, note, case_id)
+            SELECT rowid, content, petitioner, respondent, citation, note, case_id FROM case_law_fts
+            """
+        )
+        conn.execute("DROP TABLE case_law_fts")
+        conn.execute("ALTER TABLE case_law_fts_new RENAME TO case_law_fts")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
 def _ensure_case_law_schema(conn: sqlite3.Connection) -> None:
     conn.execute(
         """
@@ -101,28 +222,62 @@ def _ensure_case_law_schema(conn: sqlite3.Connection) -> None:
         )
         """
     )
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'case_law_fts'"
+    ).fetchone()
+    if row is None:
+        conn.execute(_case_law_fts_ddl("case_law_fts"))
+    elif _CASE_LAW_FTS_TOKENIZE not in row[0]:
+        _rebuild_case_law_fts(conn)
+    # /case-law/search filters on classification and year and orders by
+    # (decision_year, created_at); the filter dropdown lists distinct years.
     conn.execute(
-        """
-        CREATE VIRTUAL TABLE IF NOT EXISTS case_law_fts USING fts5(
-            content,
-            petitioner,
-            respondent,
-            citation,
-            note,
-            case_id UNINDEXED
-        )
-        """
+        "CREATE INDEX IF NOT EXISTS idx_case_law_primary_subtype ON case_law(primary_type, subtype)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_case_law_year_created ON case_law(decision_year, created_at)"
     )
 
 
+# Per-connection tuning. WAL lets searches read while an upload is writing;
+# with WAL, synchronous=NORMAL only fsyncs at checkpoints and cannot corrupt
+# the database (a power cut may drop the last commits).
+_CASE_LAW_PRAGMAS = """
+    PRAGMA synchronous = NORMAL;
+    PRAGMA cache_size = -65536;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA mmap_size = 268435456;
+"""
+# "AS MATERIALIZED" pins a CTE as a separate step; older SQLite lacks it.
+_CTE_MATERIALIZED = "MATERIALIZED " if sqlite3.sqlite_version_info >= (3, 35, 0) else ""
+# Database files this process has already switched to WAL and brought up to
+# the current schema (both persist in the file, so once is enough).
+_CASE_LAW_DB_READY: set = set()
+
+
+def open_case_law_db(path: str) -> sqlite3.Connection:
+    """Open (and on first use, set up) the case-law index at `path`."""
+    # a file removed behind our back gets recreated, so set it up again
+    first_open = path not in _CASE_LAW_DB_READY or not os.path.exists(path)
+    conn = sqlite3.connect(path, timeout=60)
+    conn.row_factory = sqlite3.Row
+    if first_open:
+        mode = conn.execute('PRAGMA journal_mode = WAL').fetchone()[0]
+        if mode.lower() != 'wal':
+            print(f"[case-law] Could not enable WAL for {path} (journal_mode={mode})")
+    conn.executescript(_CASE_LAW_PRAGMAS)
+    conn.execute('PRAGMA foreign_keys = ON')
+    if first_open:
+        _ensure_case_law_schema(conn)
+        conn.commit()
+        _CASE_LAW_DB_READY.add(path)
+        requeue_pending_case_law_text(conn, path)
+    return conn
+
+
 def get_case_law_db() -> sqlite3.Connection:
     if 'case_law_db' not in g:
-        path = _case_law_db_file()
-        conn = sqlite3.connect(path)
-        conn.row_factory = sqlite3.Row
-        conn.execute('PRAGMA foreign_keys = ON')
-        _ensure_case_law_schema(conn)
-        g.case_law_db = conn
+        g.case_law_db = open_case_law_db(str(_case_law_db_file()))
     return g.case_law_db
 
 
@@ -130,67 +285,80 @@ def get_case_law_db() -> sqlite3.Connection:
 def close_case_law_db(_: Optional[BaseException]) -> None:
     conn = g.pop('case_law_db', None)
     if conn is not None:
+        try:
+            # lets SQLite refresh planner statistics (ANALYZE) when they are stale
+            conn.execute('PRAGMA optimize')
+        except sqlite3.Error:
+            pass
         conn.close()
 
 
 def refresh_case_law_index(
     conn: sqlite3.Connection,
     case_id: int,
-    judgement_text: str,
+    judgement_text: Optional[str],
     petitioner: str,
     respondent: str,
     citation: str,
     note_text: str,
 ) -> None:
-    conn.execute("DELETE FROM case_law_fts WHERE rowid = ?", (case_id,))
+    """Write the FTS row for a case. judgement_text=None stores NULL, which
+    marks the judgment as still waiting for background text extraction."""
+    # REPLACE drops any existing row with this rowid first: one statement
+    # instead of a DELETE followed by an INSERT
     conn.execute(
         """
-        INSERT INTO case_law_fts(rowid, content, petitioner, respondent, citation, note, case_id)
-        VALUES(?, ?, ?, ?, ?, ?, ?)
+        INSERT OR REPLACE INTO case_law_fts(rowid, content, petitioner, respondent, citation, note, case_id)
+        VALUES(:case_id, :content, :petitioner, :respondent, :citation, :note, :case_id)
         """,
-        (
-            case_id,
-            judgement_text or "",
-            petitioner,
-            respondent,
-            citation,
-            note_text or "",
-            case_id,
-        ),
+        {
+            "case_id": case_id,
+            "content": judgement_text,
+            "petitioner": petitioner,
+            "respondent": respondent,
+            "citation": citation,
+            "note": note_text or "",
+        },
     )
 
 
-_NEAR_RE = re.compile(r'("[^"]+"|\S+)\s+NEAR/(\d+)\s+("[^"]+"|\S+)', re.IGNORECASE)
 _BOOLEAN_OPERATORS = {
     "and": "AND",
     "or": "OR",
     "not": "NOT",
     "near": "NEAR",
 }
+# Everything normalize_boolean_query rewrites, matched in a single scan:
+# "a NEAR/n b" (groups 1-3) or a bare operator word.
+_QUERY_REWRITE_RE = re.compile(
+    r'("[^"]+"|\S+)\s+NEAR/(\d+)\s+("[^"]+"|\S+)'
+    r"|\b(?:" + "|".join(_BOOLEAN_OPERATORS) + r")\b",
+    re.IGNORECASE,
+)
+
+
+def _rewrite_query_token(match: re.Match) -> str:
+    left, distance, right = match.groups()
+    if left is not None:
+        return f"NEAR({left} {right}, {distance})"
+    return _BOOLEAN_OPERATORS[match.group(0).lower()]
 
 
+# people refine a search by retyping mostly the same text; keep recent rewrites
+@lru_cache(maxsize=1024)
 def normalize_boolean_query(raw: str) -> str:
     query = normalize_ws(raw)
     if not query:
         return ""
-
-    def _near_sub(match: re.Match) -> str:
-        left, distance, right = match.groups()
-        return f"NEAR({left} {right}, {distance})"
-
-    query = _NEAR_RE.sub(_near_sub, query)
-    for lower, upper in _BOOLEAN_OPERATORS.items():
-        query = re.sub(rf"\b{lower}\b", upper, query, flags=re.IGNORECASE)
-    return query
+    return _QUERY_REWRITE_RE.sub(_rewrite_query_token, query)
 
 @app.before_request
 def _require_setup():
     # endpoints allowed without setup/login
     allowed_endpoints = {"setup", "set_password", "login", "static", "ping", "__routes"}
 
-    storage_ok = config.is_storage_configured()
-    users_ok   = config.is_users_configured()
-    pass_ok    = config.is_password_configured()
+    g.config_state = config.get_config_state()
+    storage_ok, users_ok, pass_ok = g.config_state
 
     # Need storage+users first
     if not storage_ok or not users_ok:
@@ -212,7 +380,7 @@ def _require_setup():
 
 @app.route("/setup", methods=["GET", "POST"])
 def setup():
-    global FS_ROOT, ALLOWED_USERS
+    global ALLOWED_USERS
     if request.method == "POST":
         chosen = (request.form.get("fs_root") or "").strip()
         users_blob = (request.form.get("users") or "").strip()
@@ -228,9 +396,8 @@ def setup():
             try:
                 p = Path(chosen).expanduser().resolve()
                 p.mkdir(parents=True, exist_ok=True)
-                config.save_fs_root(str(p))
-                config.save_users(user_list)
-                FS_ROOT = p
+                config.save_many(FS_ROOT=str(p), ALLOWED_USERS=user_list)
+                set_fs_root(p)
                 ALLOWED_USERS = set(user_list)
                 flash(f"Storage set to: {p}", "success")
                 flash("Users saved. Next: set a password.", "info")
@@ -241,32 +408,15 @@ def setup():
         for m in errs:
             flash(m, "error")
 
-    return render_template_string("""
-      <!doctype html>
-      <title>Case Organizer – Setup</title>
-      <link rel="stylesheet" href="{{ url_for('static', filename='css/style.css') }}">
-      <div class="login-body">
-        <div class="login-card">
-          <h2>Initial Setup</h2>
-          {% include '_flash.html' %}
-          <form method="post" class="login-form">
-            <label for="fs_root">Folder for fs-files</label>
-            <input id="fs_root" name="fs_root" type="text" placeholder="/mnt/data/case-files" required>
-
-            <label for="users">Allowed Users (one per line)</label>
-            <textarea id="users" name="users" rows="4" placeholder="e.g.&#10;Jyoti Aggarwal&#10;Sanjivani Aggarwal" required></textarea>
-
-            <button class="btn-primary" type="submit">Save & Continue</button>
-          </form>
-          <p class="login-foot">Settings saved to {{cfg}}</p>
-        </div>
-      </div>
-    """, cfg=str(getattr(config, "CASEORG_CONFIG", "/etc/case-organizer/config.json")))
+    return render_template(
+        "setup.html",
+        cfg=str(getattr(config, "CASEORG_CONFIG", "/etc/case-organizer/config.json")),
+    )
 
 @app.route("/set_password", methods=["GET", "POST"])
 def set_password():
     global PASSWORD
-    if config.is_password_configured():
+    if g.config_state[2]:  # populated by _require_setup
         return redirect(url_for("login"))
 
     if request.method == "POST":
@@ -282,28 +432,22 @@ def set_password():
             flash("Password set. You can now log in.", "success")
             return redirect(url_for("login"))
 
-    return render_template_string("""
-      <!doctype html>
-      <title>Set Password</title>
-      <link rel="stylesheet" href="{{ url_for('static', filename='css/style.css') }}">
-      <div class="login-body">
-        <div class="login-card">
-          <h2>Set Password</h2>
-          {% include '_flash.html' %}
-          <form method="post" class="login-form">
-            <label for="password">Shared Password</label>
-            <input id="password" name="password" type="password" required>
-            <label for="password2">Confirm Password</label>
-            <input id="password2" name="password2" type="password" required>
-            <button class="btn-primary" type="submit">Save Password</button>
-          </form>
-        </div>
-      </div>
-    """)
+    return render_template("set_password.html")
 
 
+def file_ext(name: str) -> str:
+    """Lower-cased text after the last '.', or '' if there is no dot."""
+    i = name.rfind(".")
+    return name[i + 1:].lower() if i >= 0 else ""
+
 def allowed_file(filename: str) -> bool:
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+    return file_ext(filename) in ALLOWED_EXTENSIONS
+
+_MONTH_ORDER = {
+    m: i for i, m in enumerate(
+        ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
+    )
+}
 
 def month_dir_name(dt: datetime) -> str:
     # e.g., "Jan", "Feb" ...
@@ -313,17 +457,23 @@ def ddmmyyyy(dt: datetime) -> str:
     return dt.strftime("%d%m%Y")
 
 def normalize_ws(s: str) -> str:
-    return re.sub(r"\s+", " ", s or "").strip()
+    # str.split() with no argument splits on the same whitespace as r"\s+"
+    # and drops leading/trailing runs, without a regex pass
+    return " ".join(s.split()) if s else ""
+
 
+_ILLEGAL_FS_CHARS = '\\/:*?"<>|'
 
-_ILLEGAL_FS_CHARS = re.compile(r"[\\/:*?\"<>|]")
+
+@cache
+def _illegal_fs_table(replacement: str) -> Dict[int, str]:
+    return str.maketrans(dict.fromkeys(_ILLEGAL_FS_CHARS, replacement))
 
 
 def sanitize_case_law_component(text: str, replacement: str = " ") -> str:
-    cleaned = normalize_ws(text)
-    cleaned = _ILLEGAL_FS_CHARS.sub(replacement, cleaned)
-    cleaned = normalize_ws(cleaned)
-    return cleaned
+    # translate() leaves existing whitespace alone, so one trailing
+    # normalize_ws collapses both original and replaced runs
+    return normalize_ws((text or "").translate(_illegal_fs_table(replacement)))
 
 
 def build_case_law_display_name(petitioner: str, respondent: str, citation: str) -> str:
@@ -345,22 +495,14 @@ def ensure_unique_path(path: Path) -> Path:
 
 
 def normalize_primary_type(value: str) -> Optional[str]:
-    candidate = normalize_ws(value)
-    for option in CASE_LAW_PRIMARY_TYPES:
-        if candidate.lower() == option.lower():
-            return option
-    return None
+    return _PRIMARY_TYPES_LC.get(normalize_ws(value).lower())
 
 
 def normalize_case_type(primary: str, value: str) -> Optional[str]:
-    pool = CASE_LAW_CASE_TYPES.get(primary)
+    pool = _CASE_TYPES_LC.get(primary)
     if not pool:
         return None
-    candidate = normalize_ws(value)
-    for option in pool:
-        if candidate.lower() == option.lower():
-            return option
-    return None
+    return pool.get(normalize_ws(value).lower())
 
 
 def case_law_error(message: str, status: int = 400):
@@ -379,7 +521,7 @@ def short_excerpt(text: str, limit: int = 200) -> str:
 def extract_note_summary(content: str) -> str:
     raw = content or ""
     try:
-        parsed = json.loads(raw)
+        parsed = app.json.loads(raw)
         if isinstance(parsed, dict):
             for key in ("Note", "note", "Summary", "summary", "Additional Notes", "additional_notes"):
                 value = parsed.get(key)
@@ -395,18 +537,15 @@ def fetch_case_law_record(conn: sqlite3.Connection, case_id: int) -> Optional[sq
 
 
 def case_law_file_path(row: sqlite3.Row) -> Path:
-    base = (FS_ROOT / row["folder_rel"]).resolve()
-    full = (base / row["file_name"]).resolve()
-    root = FS_ROOT.resolve()
-    if not str(full).startswith(str(root)):
+    full = (FS_ROOT / row["folder_rel"] / row["file_name"]).resolve()
+    if not is_within_root(full):
         raise RuntimeError("Resolved file path escapes storage root")
     return full
 
 
 def case_law_note_path(row: sqlite3.Row) -> Path:
     note = (FS_ROOT / row["note_path_rel"]).resolve()
-    root = FS_ROOT.resolve()
-    if not str(note).startswith(str(root)):
+    if not is_within_root(note):
         raise RuntimeError("Resolved note path escapes storage root")
     return note
 
@@ -432,31 +571,138 @@ def serialize_case_law(row: sqlite3.Row, text_preview: str = "") -> Dict[str, An
         "updated_at": row["updated_at"],
     }
 
+class DirListing(NamedTuple):
+    dirs: tuple          # real subdirectories
+    linked_dirs: tuple   # symlinks to directories (listed, never walked into)
+    files: tuple         # regular files and symlinks to files
+
+
+_EMPTY_LISTING = DirListing((), (), ())
+# dir path -> (st_mtime_ns, DirListing), least recently used first; bounded
+# so one unfiltered search cannot pin the whole archive's names in memory
+_DIR_LISTINGS: "OrderedDict[str, tuple]" = OrderedDict()
+# An unfiltered /search walks every directory in the same order, so once the
+# archive has more directories than this, a repeat walk gets no hits at all;
+# size it above the tree's directory count.
+_DIR_LISTINGS_MAX = int(os.environ.get("CASEORG_LISTING_CACHE_SIZE", "32768"))
+_DIR_LISTINGS_FULL_WARNED = False
+# search probes call list_dir from several threads at once
+_DIR_LISTINGS_LOCK = threading.Lock()
+# Listings of directories modified within this window are not cached: a
+# change landing in the same timestamp tick as our read would go unnoticed.
+_LISTING_SETTLE_NS = 2_000_000_000
+
+
+def is_staging_dir_name(name: str) -> bool:
+    """True for the ".<case>.partial" folders case_law_upload writes into."""
+    return name.startswith(".") and name.endswith(".partial")
+
+
+def list_dir(path: str) -> DirListing:
+    """
+    Entry names of `path`, reused for as long as the directory's mtime is
+    unchanged. Creating, deleting or renaming an entry bumps that mtime, so
+    a cached listing is only served while it is still exact and a repeat
+    scan costs one stat() instead of a readdir.
+    """
+    global _DIR_LISTINGS_FULL_WARNED
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        with _DIR_LISTINGS_LOCK:
+            _DIR_LISTINGS.pop(path, None)
+        return _EMPTY_LISTING
+    with _DIR_LISTINGS_LOCK:
+        hit = _DIR_LISTINGS.get(path)
+        if hit is not None and hit[0] == mtime:
+            _DIR_LISTINGS.move_to_end(path)
+            return hit[1]
+
+    dirs, linked, files = [], [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                # DirEntry answers these from the readdir d_type; only
+                # symlinks cost an extra stat
+                if entry.is_dir(follow_symlinks=False):
+                    # keep in-progress case-law uploads out of view
+                    if not is_staging_dir_name(entry.name):
+                        dirs.append(entry.name)
+                elif entry.is_dir():
+                    linked.append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+    except OSError:
+        return _EMPTY_LISTING
+    listing = DirListing(tuple(dirs), tuple(linked), tuple(files))
+    if time.time_ns() - mtime > _LISTING_SETTLE_NS:
+        with _DIR_LISTINGS_LOCK:
+            _DIR_LISTINGS[path] = (mtime, listing)
+            _DIR_LISTINGS.move_to_end(path)
+            if len(_DIR_LISTINGS) > _DIR_LISTINGS_MAX:
+                _DIR_LISTINGS.popitem(last=False)
+                if not _DIR_LISTINGS_FULL_WARNED:
+                    _DIR_LISTINGS_FULL_WARNED = True
+                    print(
+                        f"[search] Directory listing cache is full ({_DIR_LISTINGS_MAX}); "
+                        "set CASEORG_LISTING_CACHE_SIZE above the number of folders under FS_ROOT"
+                    )
+    return listing
+
+
+def subdir_names(path: str) -> tuple:
+    """Names of the child directories of `path` (empty if it is not a directory)."""
+    listing = list_dir(path)
+    return listing.dirs + listing.linked_dirs
+
+
+def walk_tree(
+    top: str, prune: Optional[Callable[[str, tuple], Iterable[str]]] = None
+) -> Iterable[tuple]:
+    """Yield (dir_path, file_names) for `top` and every directory below it,
+    depth first, without descending into directory symlinks.
+
+    `prune(dir_path, subdir_names)`, when given, returns the subdirectories
+    worth descending into; the rest are never listed.
+    """
+    stack = [top]
+    while stack:
+        path = stack.pop()
+        listing = list_dir(path)
+        if listing.files:
+            yield path, listing.files
+        subdirs = listing.dirs if prune is None else prune(path, listing.dirs)
+        # pushed in reverse so siblings pop off in listing order, as os.walk
+        stack.extend(os.path.join(path, name) for name in reversed(subdirs))
+
+
 def case_dir(year: int, month_str: str, case_name: str) -> Path:
     return FS_ROOT / f"{year}" / month_str / case_name
 
+_DOMAIN_CODES = {"criminal": "CRL", "civil": "CIVIL", "commercial": "COMM"}
+
+# Extend this mapping as needed (keys are lower-cased main types)
+_TYPE_CODES = {
+    "transfer petition":      "TP",
+    "criminal revision":      "CRL.REV.",
+    "writ petition":          "WP",
+    "bail application":       "BAIL",
+    "orders":                 "ORD",
+    "order":                  "ORD",
+    "criminal miscellaneous": "CRL.MISC.",
+}
+
 def domain_code(domain: str) -> str:
-    d = (domain or "").strip().lower()
-    if d == "criminal": return "CRL"
-    if d == "civil":    return "CIVIL"
-    if d == "commercial": return "COMM"
-    return d.upper() if d else ""
+    d = (domain or "").strip()
+    return _DOMAIN_CODES.get(d.lower(), d.upper())
 
 def type_code(main_type: str) -> str:
-    m = (main_type or "").strip().lower()
-    # Extend this mapping as needed
-    if m == "transfer petition":      return "TP"
-    if m == "criminal revision":      return "CRL.REV."
-    if m == "writ petition":          return "WP"
-    if m == "bail application":       return "BAIL"
-    if m == "orders" or m == "order": return "ORD"
-    if m == "criminal miscellaneous": return "CRL.MISC."
-    return (main_type or "").upper()
-
-def build_filename(dt: datetime, main_type: str, domain: str, case_name: str, ext: str) -> str:
-    # (DDMMYYYY) TYPE DOMAIN Petitioner v. Respondent.ext
-    prefix = f"({ddmmyyyy(dt)}) {type_code(main_type)} {domain_code(domain)} {case_name}"
-    return f"{prefix}.{ext}"
+    m = main_type or ""
+    return _TYPE_CODES.get(m.strip().lower(), m.upper())
+
+def build_filename_prefix(dt: datetime, main_type: str, domain: str, case_name: str) -> str:
+    # (DDMMYYYY) TYPE DOMAIN Petitioner v. Respondent
+    return f"({ddmmyyyy(dt)}) {type_code(main_type)} {domain_code(domain)} {case_name}"
 
 def build_case_name_from_parties(petitioner: str, respondent: str) -> str:
     pn = normalize_ws(petitioner)
@@ -464,23 +710,139 @@ def build_case_name_from_parties(petitioner: str, respondent: str) -> str:
     return f"{pn} v. {rn}" if pn and rn else ""
 
 
+_EXTRACT_POOL: Optional[ProcessPoolExecutor] = None
+# Seconds one document may take in the extraction worker before it is killed
+_EXTRACT_TIMEOUT = float(os.environ.get("CASEORG_EXTRACT_TIMEOUT", "300"))
+
+
+def _extract_pool() -> ProcessPoolExecutor:
+    """Worker processes for PDF/DOCX text extraction, started on first use."""
+    global _EXTRACT_POOL
+    if _EXTRACT_POOL is None:
+        # spawn rather than fork: the server is multi-threaded and a forked
+        # child could inherit locks held by other request threads. Spawned
+        # workers re-run the main script, which is why the service starts
+        # from caseorg_server.py rather than from this file. One worker is
+        # enough: the single indexer thread waits on each job in turn.
+        _EXTRACT_POOL = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _EXTRACT_POOL
+
+
 def extract_text_for_index(file_path: Path) -> str:
-    suffix = file_path.suffix.lower()
+    """
+    Plain text of a judgment for the FTS index. pdfminer/python-docx are pure
+    Python and would hold the GIL for seconds, stalling every other request
+    thread, so those formats are extracted in a worker process.
+    """
+    global _EXTRACT_POOL
+    path = str(file_path)
+    if file_path.suffix.lower() not in caseorg_extract.HEAVY_SUFFIXES:
+        return caseorg_extract.extract_text(path)
+    pool = _extract_pool()
     try:
-        if suffix == ".pdf":
-            from pdfminer.high_level import extract_text  # type: ignore
+        return pool.submit(caseorg_extract.extract_text, path).result(
+            timeout=_EXTRACT_TIMEOUT
+        )
+    except FuturesTimeoutError:
+        # A document that wedges the parser would otherwise hold up every
+        # later upload behind it: kill the worker and index the case without
+        # judgment text ("" rather than NULL, so it is not re-queued).
+        print(f"[case-law] Extraction timed out after {_EXTRACT_TIMEOUT}s for {file_path}")
+        _EXTRACT_POOL = None
+        workers = list((pool._processes or {}).values())  # no public kill in 3.11
+        pool.shutdown(wait=False, cancel_futures=True)
+        for proc in workers:
+            proc.terminate()
+        return ""
+    except Exception as exc:  # e.g. BrokenProcessPool: extract here instead
+        print(f"[case-law] Extraction worker failed for {file_path}: {exc}")
+        if isinstance(exc, BrokenProcessPool):
+            _EXTRACT_POOL = None  # start a fresh pool next time
+        return caseorg_extract.extract_text(path)
 
-            return extract_text(str(file_path))
-        if suffix == ".txt":
-            return file_path.read_text(encoding="utf-8", errors="ignore")
-        if suffix == ".docx":
-            from docx import Document  # type: ignore
 
-            doc = Document(str(file_path))
-            return "\n".join(p.text for p in doc.paragraphs)
-    except Exception as exc:
-        print(f"[case-law] Failed to extract text from {file_path}: {exc}")
-    return ""
+# Judgment text is extracted off the request path: uploads store the FTS row
+# with content NULL and queue (db_path, case_id, file) here; a single daemon
+# thread fills the text in. NULL rows left by a restart are re-queued the
+# first time the database is opened.
+_INDEX_QUEUE: "queue.Queue[tuple]" = queue.Queue()
+_INDEX_THREAD: Optional[threading.Thread] = None
+_INDEX_THREAD_LOCK = threading.Lock()
+
+
+def _case_law_index_worker() -> None:
+    while True:
+        db_path, case_id, file_path = _INDEX_QUEUE.get()
+        try:
+            text = extract_text_for_index(file_path)
+            conn = open_case_law_db(db_path)
+            try:
+                # only the content column: the note may have been edited since
+                conn.execute(
+                    "UPDATE case_law_fts SET content = ? WHERE rowid = ?", (text, case_id)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as exc:
+            print(f"[case-law] Indexing failed for case {case_id} ({file_path}): {exc}")
+        finally:
+            _INDEX_QUEUE.task_done()
+
+
+def enqueue_case_law_text(db_path: str, case_id: int, file_path: Path) -> None:
+    global _INDEX_THREAD
+    with _INDEX_THREAD_LOCK:
+        if _INDEX_THREAD is None or not _INDEX_THREAD.is_alive():
+            _INDEX_THREAD = threading.Thread(
+                target=_case_law_index_worker, name="case-law-indexer", daemon=True
+            )
+            _INDEX_THREAD.start()
+    _INDEX_QUEUE.put((db_path, case_id, file_path))
+
+
+def requeue_pending_case_law_text(conn: sqlite3.Connection, db_path: str) -> None:
+    """Queue every case whose judgment text was never extracted."""
+    if not FS_ROOT:
+        return
+    rows = conn.execute(
+        """
+        SELECT c.* FROM case_law_fts f JOIN case_law c ON c.id = f.rowid
+        WHERE f.content IS NULL
+        """
+    ).fetchall()
+    for row in rows:
+        try:
+            enqueue_case_law_text(db_path, row["id"], case_law_file_path(row))
+        except RuntimeError:
+            continue
+
+
+# Note.json layout: each tuple is one block, blocks are separated by a blank line
+_NOTE_SECTIONS = (
+    ("Petitioner Name", "Petitioner Address", "Petitioner Contact"),
+    ("Respondent Name", "Respondent Address", "Respondent Contact"),
+    ("Our Party",),
+    ("Case Category", "Case Subcategory", "Case Type"),
+    ("Court of Origin",),
+    ("Current Court/Forum",),
+    ("Additional Notes",),
+)
+# Court blocks are nested objects assembled from flat payload fields
+_NOTE_COURT_FIELDS = {
+    "Court of Origin": ("Origin State", "Origin District", "Origin Court/Forum"),
+    "Current Court/Forum": ("Current State", "Current District", "Current Court/Forum"),
+}
+_NOTE_COURT_KEYS = ("State", "District", "Court/Forum")
+
+
+def _dumps_indented(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, indent=2, ensure_ascii=False)
 
 
 def make_note_json(payload: Dict[str, Any]) -> str:
@@ -488,45 +850,24 @@ def make_note_json(payload: Dict[str, Any]) -> str:
     Produce a human-readable JSON-like text with blank lines between sections.
     Valid JSON with extra blank lines (allowed) for easy reading in editors.
     """
-    from collections import OrderedDict
-    from json import dumps
-
-    od = OrderedDict()
-    # Parties
-    od["Petitioner Name"] = payload.get("Petitioner Name", "")
-    od["Petitioner Address"] = payload.get("Petitioner Address", "")
-    od["Petitioner Contact"] = payload.get("Petitioner Contact", "")
-    od["__BLANK1__"] = ""
-    od["Respondent Name"] = payload.get("Respondent Name", "")
-    od["Respondent Address"] = payload.get("Respondent Address", "")
-    od["Respondent Contact"] = payload.get("Respondent Contact", "")
-    od["__BLANK2__"] = ""
-    od["Our Party"] = payload.get("Our Party", "")
-    od["__BLANK3__"] = ""
-    # Classification
-    od["Case Category"] = payload.get("Case Category", "")
-    od["Case Subcategory"] = payload.get("Case Subcategory", "")
-    od["Case Type"] = payload.get("Case Type", "")
-    od["__BLANK4__"] = ""
-    # Courts
-    od["Court of Origin"] = {
-        "State":   payload.get("Origin State", ""),
-        "District":payload.get("Origin District", ""),
-        "Court/Forum": payload.get("Origin Court/Forum", ""),
-    }
-    od["__BLANK5__"] = ""
-    od["Current Court/Forum"] = {
-        "State":   payload.get("Current State", ""),
-        "District":payload.get("Current District", ""),
-        "Court/Forum": payload.get("Current Court/Forum", ""),
-    }
-    od["__BLANK6__"] = ""
-    od["Additional Notes"] = payload.get("Additional Notes", "")
+    blocks = []
+    for keys in _NOTE_SECTIONS:
+        section = {}
+        for key in keys:
+            court = _NOTE_COURT_FIELDS.get(key)
+            if court:
+                section[key] = {sub: payload.get(src, "") for sub, src in zip(_NOTE_COURT_KEYS, court)}
+            else:
+                section[key] = payload.get(key, "")
+        # strip the section's own "{\n" ... "\n}" so the blocks can be joined
+        blocks.append(_dumps_indented(section)[2:-2])
+    return "{\n" + ",\n\n".join(blocks) + "\n}"
 
-    s = dumps(od, indent=2, ensure_ascii=False)
-    # Replace spacer keys with blank lines
-    s = re.sub(r'\n\s+"__BLANK[0-9]+__":\s*"",\n', "\n\n", s)
-    return s
+
+@cache
+def note_template() -> str:
+    """The blank Note.json skeleton offered by the note editor (never changes)."""
+    return make_note_json({})
 
 # ---- Diagnostics --------------------------------------------------------
 @app.get("/ping")
@@ -544,11 +885,10 @@ def __routes():
 # ---- Browse APIs for Manage Case ---------------------------------------
 @app.get("/api/years")
 def api_years():
-    years = []
-    if FS_ROOT.exists():
-        for p in FS_ROOT.iterdir():
-            if p.is_dir() and re.fullmatch(r"\d{4}", p.name):
-                years.append(p.name)
+    years = [
+        name for name in subdir_names(FS_ROOT_STR)
+        if len(name) == 4 and name.isdigit()
+    ]
     years.sort()  # ascending "2024", "2025"
     return jsonify({"years": years})
 
@@ -556,30 +896,39 @@ def api_years():
 def api_months():
     year = (request.args.get("year") or "").strip()
     months = []
-    base = FS_ROOT / year
-    if year and base.exists() and base.is_dir():
-        for m in base.iterdir():
-            if m.is_dir():
-                months.append(m.name)
-    # order by calendar month if using Jan..Dec names
-    order = ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
-    months.sort(key=lambda x: order.index(x) if x in order else x)
+    if year:
+        months = list(subdir_names(os.path.join(FS_ROOT_STR, year)))
+    # order by calendar month if using Jan..Dec names, anything else after
+    months.sort(key=lambda x: (_MONTH_ORDER.get(x, len(_MONTH_ORDER)), x))
     return jsonify({"months": months})
 
 @app.get("/api/cases")
 def api_cases():
     year  = (request.args.get("year") or "").strip()
     month = (request.args.get("month") or "").strip()
-    cases = []
-    base = FS_ROOT / year / month
-    if base.exists() and base.is_dir():
-        for d in base.iterdir():
-            if d.is_dir():
-                cases.append(d.name)
+    cases = list(subdir_names(os.path.join(FS_ROOT_STR, year, month)))
     cases.sort(key=lambda s: s.lower())  # alphabetical by case name
     return jsonify({"cases": cases})
 
 # ---- Auth & Home --------------------------------------------------------
+# Minimal pages for when the real templates are missing; compiled once here
+# rather than re-parsed by render_template_string on every request.
+_FALLBACK_LOGIN = app.jinja_env.from_string("""
+    <!doctype html><title>Login</title>
+    <h1>Case Organizer (fallback login)</h1>
+    <form method="post">
+      <input name="username" placeholder="Username" required>
+      <input name="password" type="password" placeholder="Password" required>
+      <button>Login</button>
+    </form>
+""")
+_FALLBACK_HOME = app.jinja_env.from_string("""
+    <!doctype html><title>Home</title>
+    <h1>Home (fallback)</h1>
+    <p>Logged in as: {{ session.get('user') }}</p>
+    <p><a href="{{ url_for('logout') }}">Logout</a></p>
+""")
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
@@ -594,15 +943,7 @@ def login():
         return render_template("login.html")
     except Exception:
         # Minimal fallback if template missing
-        return render_template_string("""
-            <!doctype html><title>Login</title>
-            <h1>Case Organizer (fallback login)</h1>
-            <form method="post">
-              <input name="username" placeholder="Username" required>
-              <input name="password" type="password" placeholder="Password" required>
-              <button>Login</button>
-            </form>
-        """)
+        return render_template(_FALLBACK_LOGIN)
 
 @app.route("/logout")
 def logout():
@@ -615,12 +956,7 @@ def home():
     try:
         return render_template("index.html")
     except Exception:
-        return render_template_string("""
-            <!doctype html><title>Home</title>
-            <h1>Home (fallback)</h1>
-            <p>Logged in as: {{ session.get('user') }}</p>
-            <p><a href="{{ url_for('logout') }}">Logout</a></p>
-        """)
+        return render_template(_FALLBACK_HOME)
 
 # ---- Create Case --------------------------------------------------------
 @app.post("/create-case")
@@ -670,6 +1006,79 @@ def create_case():
 
 # ---- Manage Case (Upload, Copy & Rename) --------------------------------
 
+def _upload_fd(f) -> Optional[int]:
+    """OS-level fd backing an upload, or None if it is only held in memory."""
+    # Werkzeug spools uploads in a SpooledTemporaryFile: a BytesIO until it
+    # grows past 500 KiB, a real temp file after that. Look at the inner file
+    # so asking for a fd never forces an in-memory upload onto disk.
+    raw = getattr(f.stream, "_file", f.stream)
+    try:
+        return raw.fileno()
+    except (AttributeError, OSError):
+        return None
+
+
+def write_upload(f, out) -> None:
+    """Copy an uploaded file into the binary file `out`, in the kernel when possible."""
+    src_fd = _upload_fd(f) if _SENDFILE_TO_FILE else None
+    if src_fd is None:
+        shutil.copyfileobj(f.stream, out, length=1 << 20)
+        return
+    out.flush()
+    offset = f.stream.tell()
+    size = os.fstat(src_fd).st_size
+    while offset < size:
+        sent = os.sendfile(out.fileno(), src_fd, offset, size - offset)
+        if not sent:
+            break
+        offset += sent
+
+
+_EXCL_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_CLOEXEC", 0)
+
+
+def create_unique_file(target_dir: Path, new_name: str, first: int = 0) -> tuple:
+    """
+    Create target_dir/new_name, or the first free "<stem>_N<suffix>", and
+    return (path, fd, N) (N is 0 for the plain name). O_EXCL makes taking the
+    name a single atomic open, so two requests saving the same name at once
+    can never overwrite each other. `first` skips suffixes known to be taken.
+    """
+    dest = target_dir / new_name
+    stem, suffix = dest.stem, dest.suffix
+    for counter in range(first, 10000):
+        candidate = target_dir / f"{stem}_{counter}{suffix}" if counter else dest
+        try:
+            return candidate, os.open(candidate, _EXCL_FLAGS, 0o666), counter
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"No free file name for {dest}")
+
+
+def save_upload_unique(
+    f, target_dir: Path, new_name: str, next_free: Optional[Dict[str, int]] = None
+) -> Path:
+    """
+    Save an uploaded file as target_dir/new_name, appending _1, _2, ... to the
+    stem if that name is taken. A failed write removes the partial file.
+
+    Pass the same `next_free` dict for every file of a batch: it remembers the
+    next untried suffix per name, so N files landing on one name cost N opens
+    in total rather than N*(N+1)/2.
+    """
+    first = next_free.get(new_name, 0) if next_free is not None else 0
+    final_dest, fd, counter = create_unique_file(target_dir, new_name, first)
+    if next_free is not None:
+        next_free[new_name] = counter + 1
+    try:
+        with open(fd, "wb") as out:
+            write_upload(f, out)
+    except BaseException:
+        final_dest.unlink(missing_ok=True)
+        raise
+    return final_dest
+
+
 @app.post("/manage-case/upload")
 def manage_case_upload():
     form = request.form
@@ -707,10 +1116,10 @@ def manage_case_upload():
 
     # Helper: safe original base (without extension)
     def safe_stem(filename: str) -> str:
-        base = Path(secure_filename(filename)).stem
-        return re.sub(r"\s+", " ", base).strip()
+        return normalize_ws(Path(secure_filename(filename)).stem)
 
     saved_paths = []
+    next_free: Dict[str, int] = {}  # per-batch suffix memo for save_upload_unique
 
     # ---------- NEW: Case Law handling ----------
     if domain.lower() == "case law":
@@ -723,26 +1132,14 @@ def manage_case_upload():
             if not allowed_file(f.filename):
                 continue
 
-            ext = f.filename.rsplit(".", 1)[1].lower()
+            ext = file_ext(f.filename)
 
-            # Filename = Main Type (as typed) OR fallback to original stem
-            base = (main_type or "").strip() or safe_stem(f.filename)
-            # sanitize whitespace
-            base = re.sub(r"\s+", " ", base).strip()
+            # Filename = Main Type (as typed, already whitespace-normalized)
+            # OR fallback to original stem
+            base = main_type or safe_stem(f.filename)
             new_name = f"{base}.{ext}"
 
-            tmp = target_dir / secure_filename(f"_upload_{datetime.now().timestamp()}_{secure_filename(f.filename)}")
-            f.save(tmp)
-            dest = target_dir / new_name
-
-            final_dest = dest
-            counter = 1
-            while final_dest.exists():
-                final_dest = target_dir / (dest.stem + f"_{counter}" + dest.suffix)
-                counter += 1
-
-            shutil.copyfile(tmp, final_dest)
-            tmp.unlink(missing_ok=True)
+            final_dest = save_upload_unique(f, target_dir, new_name, next_free)
             saved_paths.append(str(final_dest))
 
         if not saved_paths:
@@ -755,36 +1152,28 @@ def manage_case_upload():
     target_dir = cdir / subcategory if subcategory else cdir
     target_dir.mkdir(parents=True, exist_ok=True)
 
+    # Naming rules (same for every file in the batch):
+    # - If subcategory is "Primary Documents" OR main_type is empty => keep original name, append " - {Case Name}"
+    # - Else => use the typed scheme "(DDMMYYYY) TYPE DOMAIN CaseName.ext"
+    keep_original_name = subcategory.lower() == "primary documents" or not main_type
+    # the typed name differs only by extension between files, so build it once
+    name_prefix = "" if keep_original_name else build_filename_prefix(dt, main_type, domain, case_name)
+
     for f in files:
         if not f or f.filename == "":
             continue
         if not allowed_file(f.filename):
             continue
 
-        ext = f.filename.rsplit(".", 1)[1].lower()
+        ext = file_ext(f.filename)
 
-        # Naming rules:
-        # - If subcategory is "Primary Documents" OR main_type is empty => keep original name, append " - {Case Name}"
-        # - Else => use the typed scheme "(DDMMYYYY) TYPE DOMAIN CaseName.ext"
-        is_primary_docs = subcategory and subcategory.strip().lower() == "primary documents"
-        if is_primary_docs or not main_type:
+        if keep_original_name:
             base = safe_stem(f.filename)
             new_name = f"{base} - {case_name}.{ext}"
         else:
-            new_name = build_filename(dt, main_type, domain, case_name, ext)
-
-        tmp = target_dir / secure_filename(f"_upload_{datetime.now().timestamp()}_{secure_filename(f.filename)}")
-        f.save(tmp)
-        dest = target_dir / new_name
+            new_name = f"{name_prefix}.{ext}"
 
-        final_dest = dest
-        counter = 1
-        while final_dest.exists():
-            final_dest = target_dir / (dest.stem + f"_{counter}" + dest.suffix)
-            counter += 1
-
-        shutil.copyfile(tmp, final_dest)
-        tmp.unlink(missing_ok=True)
+        final_dest = save_upload_unique(f, target_dir, new_name, next_free)
         saved_paths.append(str(final_dest))
 
     if not saved_paths:
@@ -794,6 +1183,41 @@ def manage_case_upload():
 
 # ---- Safe file serving (whitelist FS_ROOT) ------------------------------
 
+def serve_file(path: Path, as_attachment: bool = False):
+    """
+    Respond with a file that lives under FS_ROOT. With ACCEL_REDIRECT_PREFIX
+    set, nginx is told where to find it and sends the bytes itself; otherwise
+    send_file() streams it (conditional, so ETag and Range requests work).
+    """
+    path_str = str(path)
+    if ACCEL_REDIRECT_PREFIX and FS_ROOT_PREFIX and path_str.startswith(FS_ROOT_PREFIX):
+        rel = path_str[len(FS_ROOT_PREFIX):].replace(os.sep, "/")
+        resp = app.response_class(
+            mimetype=mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        )
+        resp.headers["X-Accel-Redirect"] = ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(rel)
+        # same header send_file builds: a plain filename for ASCII names,
+        # otherwise an NFKD-folded ASCII fallback plus RFC 5987 filename*
+        name = path.name
+        if name.isascii():
+            names = {"filename": name}
+        else:
+            simple = unicodedata.normalize("NFKD", name)
+            names = {
+                "filename": simple.encode("ascii", "ignore").decode("ascii"),
+                "filename*": "UTF-8''" + quote(name, safe="!#$&+-.^_`|~"),
+            }
+        resp.headers.set(
+            "Content-Disposition", "attachment" if as_attachment else "inline", **names
+        )
+    else:
+        resp = send_file(path, as_attachment=as_attachment, conditional=True)
+    # Case files sit behind the login: browsers may keep them (revalidating
+    # by ETag/Last-Modified), shared proxies must not.
+    resp.cache_control.private = True
+    return resp
+
+
 @app.get("/static-serve")
 def static_serve():
     raw = request.args.get("path", "")
@@ -802,116 +1226,149 @@ def static_serve():
         path = Path(raw).resolve(strict=True)
     except Exception:
         return "Not found", 404
-    root = FS_ROOT.resolve()
-    if not str(path).startswith(str(root)) or not path.is_file():
+    if not is_within_root(path) or not path.is_file():
         return "Not found", 404
-    return send_file(path, as_attachment=download)
+    return serve_file(path, as_attachment=download)
 
 # ---- Search -------------------------------------------------------------
 
-@app.get("/search")
-def search():
-    """
-    Query params:
-      q: free text (matches relative path)
-      year: '2025'
-      month: 'Jan' | 'Feb' | ...
-      party: fragment to match in Case folder name (Petitioner v. Respondent)
-      domain: 'Criminal' | 'Civil' | 'Commercial'
-      subcategory: subfolder name e.g. 'Transfer Petitions', 'Orders/Judgments', 'Primary Documents'
-      type: ignored for folder-driven search (still accepted but not required)
-    Behavior:
-      - If domain is given but subcategory is empty => return empty result set (force specificity).
-      - If subcategory is provided => enumerate case dirs and list files found under that subfolder only.
-      - Otherwise (no domain/subcategory) => fallback to broad scan with q/party/year/month filters.
-    """
-    q        = normalize_ws(request.args.get("q"))
-    year     = normalize_ws(request.args.get("year"))
-    month    = normalize_ws(request.args.get("month"))
-    party    = normalize_ws(request.args.get("party"))
-    domain   = normalize_ws(request.args.get("domain"))        # used only to require subcat if provided
-    subcat   = normalize_ws(request.args.get("subcategory"))
-    # ftype kept for backward compat but not used in folder mode
-    # ftype    = normalize_ws(request.args.get("type"))
-
-    results = []
-    if not FS_ROOT.exists():
-        return jsonify({"results": results})
-
-    # Helper: yield candidate month directories given year/month filters
-    def month_dirs():
-        root = FS_ROOT
-        years = [FS_ROOT / year] if year else [d for d in root.iterdir() if d.is_dir()]
-        for y in years:
-            if not y.is_dir():
-                continue
-            months = [y / month] if month else [d for d in y.iterdir() if d.is_dir()]
-            for m in months:
-                if m.is_dir():
-                    yield m  # e.g., fs-files/2025/Jan
+# Threads for the per-case directory probes of folder-driven search; they
+# spend their time blocked in readdir()/stat(), which releases the GIL.
+_SEARCH_WORKERS = 8
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=_SEARCH_WORKERS, thread_name_prefix="search")
+# case probes one search keeps in flight on that pool
+_SEARCH_WINDOW = 2 * _SEARCH_WORKERS
 
+
+def iter_search_results(
+    q: str, year: str, month: str, party: str, domain: str, subcat: str
+) -> Iterable[Dict[str, str]]:
+    """Yield /search matches ({"file", "path", "rel"}) as the walk finds them."""
     # HARD RULE: if domain is given but subcategory is missing -> force empty
     if domain and not subcat:
-        return jsonify({"results": []})
+        return
+
+    root_str = FS_ROOT_STR
+    if not os.path.isdir(root_str):
+        return
+
+    # year/month name single path segments; anything else can never match a
+    # folder, so bail out before touching the disk
+    for seg in (year, month):
+        if seg and (os.sep in seg or seg in (".", "..")):
+            return
+
+    # Narrow every scan below to FS_ROOT/<year>[/<month>] when given; a
+    # missing directory there means nothing can match.
+    scope = root_str
+    if year:
+        scope = os.path.join(scope, year, month) if month else os.path.join(scope, year)
+        if not os.path.isdir(scope):
+            return
+
+    root_len = len(FS_ROOT_PREFIX)  # strip "<FS_ROOT>/" to get the relative path
+    # case-folded once here rather than per case dir / file in the loops below;
+    # casefold() also matches "ß" against "ss" and similar non-ASCII pairs
+    q_lc = q.casefold()
+    party_lc = party.casefold()
+
+    # Helper: yield candidate month directory paths given year/month filters
+    def month_dirs():
+        if year and month:
+            yield scope
+            return
+        if year:
+            for name in subdir_names(scope):
+                yield os.path.join(scope, name)  # e.g., fs-files/2025/Jan
+            return
+        for y in subdir_names(root_str):
+            y = os.path.join(root_str, y)
+            if month:
+                m = os.path.join(y, month)
+                if os.path.isdir(m):
+                    yield m
+            else:
+                for name in subdir_names(y):
+                    yield os.path.join(y, name)
 
     # FOLDER-DRIVEN SEARCH when subcategory is present
     if subcat:
-        subcat_lower = subcat.lower()
-
-        for mdir in month_dirs():
-            # case directories: fs-files/YYYY/Mon/<Case Name>
-            for case_dir_path in mdir.iterdir():
-                if not case_dir_path.is_dir():
+        subcat_lc = subcat.casefold()
+
+        def case_dirs():
+            for mdir in month_dirs():
+                # case directories: fs-files/YYYY/Mon/<Case Name>
+                for case_name in subdir_names(mdir):  # "Petitioner v. Respondent"
+                    # party filter against case folder name
+                    if party_lc and party_lc not in case_name.casefold():
+                        continue
+                    yield os.path.join(mdir, case_name)
+
+        def scan_case(case_path):
+            # locate a child directory whose name matches subcategory (case-insensitive)
+            target = None
+            for child in subdir_names(case_path):
+                if child.casefold() == subcat_lc:
+                    target = os.path.join(case_path, child)
+                    break
+            if target is None:
+                return []  # this case has no such subcategory folder
+
+            # list allowed files inside that subcategory folder (non-recursive)
+            hits = []
+            for name in sorted(list_dir(target).files):
+                if file_ext(name) not in ALLOWED_EXTENSIONS:
                     continue
 
-                case_name = case_dir_path.name  # "Petitioner v. Respondent"
-
-                # party filter against case folder name
-                if party and party.lower() not in case_name.lower():
+                p = os.path.join(target, name)
+                rel = p[root_len:]
+                # optional q filter against relative path text
+                if q_lc and q_lc not in rel.casefold():
                     continue
 
-                # locate a child directory whose name matches subcategory (case-insensitive)
-                target = None
-                for child in case_dir_path.iterdir():
-                    if child.is_dir() and child.name.lower() == subcat_lower:
-                        target = child
-                        break
-                if target is None:
-                    continue  # this case has no such subcategory folder
-
-                # list allowed files inside that subcategory folder (non-recursive)
-                for name in sorted(os.listdir(target)):
-                    p = target / name
-                    if not p.is_file():
-                        continue
-                    if "." not in name:
-                        continue
-                    ext = name.rsplit(".", 1)[1].lower()
-                    if ext not in ALLOWED_EXTENSIONS:
-                        continue
-
-                    rel = p.relative_to(FS_ROOT)
-                    # optional q filter against relative path text
-                    if q and (q.lower() not in str(rel).lower()):
-                        continue
-
-                    results.append({
-                        "file": name,
-                        "path": str(p),
-                        "rel":  str(rel),
-                    })
+                hits.append({
+                    "file": name,
+                    "path": p,
+                    "rel":  rel,
+                })
+            return hits
+
+        # cases are independent and the scan is stat/readdir bound, so probe
+        # a few of them concurrently. Only a small window is in flight at a
+        # time (unlike Executor.map, which submits everything up front): the
+        # walk advances as results are consumed, hits stream in walk order,
+        # and one broad query cannot flood the shared pool's queue.
+        window: deque = deque()
+        try:
+            for case_path in case_dirs():
+                window.append(_SEARCH_POOL.submit(scan_case, case_path))
+                if len(window) >= _SEARCH_WINDOW:
+                    yield from window.popleft().result()
+            while window:
+                yield from window.popleft().result()
+        finally:
+            # client went away mid-stream: drop the probes not yet started
+            for fut in window:
+                fut.cancel()
 
-        return jsonify({"results": results})
+        return
 
     # FALLBACK: no subcategory provided -> optional broad search
     # (Only if user didn't specify domain; if domain is provided we already early-returned empty)
-    for root, dirs, files in os.walk(FS_ROOT):
+    def prune(dir_path, subdirs):
+        # don't descend where the month/party filters below can never match;
+        # depth = number of segments below FS_ROOT (1 = year dir, 2 = month dir)
+        depth = dir_path[root_len:].count(os.sep) + 1 if dir_path != root_str else 0
+        if depth == 1 and month:
+            return [d for d in subdirs if d == month]
+        if depth == 2 and party_lc:
+            return [d for d in subdirs if party_lc in d.casefold()]
+        return subdirs
+
+    for dir_path, names in walk_tree(scope, prune):
         # Apply year/month filters by relative path segments
-        try:
-            rel = Path(root).relative_to(FS_ROOT)
-            parts = rel.parts  # e.g., ('2025','Jan','Case Name', 'Some Subdir'...)
-        except Exception:
-            parts = ()
+        rel_dir = dir_path[root_len:]
+        parts = rel_dir.split(os.sep) if rel_dir else []  # e.g., ['2025','Jan','Case Name', 'Some Subdir'...]
 
         if year and (len(parts) < 1 or parts[0] != year):
             continue
@@ -919,30 +1376,78 @@ def search():
             continue
 
         # party filter checks the Case Name when available (3rd segment)
-        if party:
+        if party_lc:
             case_seg = parts[2] if len(parts) >= 3 else ""
-            if party.lower() not in case_seg.lower():
+            if party_lc not in case_seg.casefold():
                 continue
 
-        for name in files:
-            if "." not in name:
-                continue
-            ext = name.rsplit(".", 1)[1].lower()
-            if ext not in ALLOWED_EXTENSIONS:
+        for name in names:
+            if file_ext(name) not in ALLOWED_EXTENSIONS:
                 continue
-            p = Path(root) / name
-            rel_file = p.relative_to(FS_ROOT)
+            p = os.path.join(dir_path, name)
+            rel_file = p[root_len:]
 
-            if q and (q.lower() not in str(rel_file).lower()):
+            if q_lc and q_lc not in rel_file.casefold():
                 continue
 
-            results.append({
+            yield {
                 "file": name,
-                "path": str(p),
-                "rel":  str(rel_file),
-            })
+                "path": p,
+                "rel":  rel_file,
+            }
+
+
+@app.get("/search")
+def search():
+    """
+    Query params:
+      q: free text (matches relative path)
+      year: '2025'
+      month: 'Jan' | 'Feb' | ...
+      party: fragment to match in Case folder name (Petitioner v. Respondent)
+      domain: 'Criminal' | 'Civil' | 'Commercial'
+      subcategory: subfolder name e.g. 'Transfer Petitions', 'Orders/Judgments', 'Primary Documents'
+      type: ignored for folder-driven search (still accepted but not required)
+    Behavior:
+      - If domain is given but subcategory is empty => return empty result set (force specificity).
+      - If subcategory is provided => enumerate case dirs and list files found under that subfolder only.
+      - Otherwise (no domain/subcategory) => fallback to broad scan with q/party/year/month filters.
+    Response:
+      - {"results": [...]} by default.
+      - With ?format=ndjson (or Accept: application/x-ndjson) one JSON object per
+        line.
+      Both are streamed while the walk is still running.
+    """
+    matches = iter_search_results(
+        q=normalize_ws(request.args.get("q")),
+        year=normalize_ws(request.args.get("year")),
+        month=normalize_ws(request.args.get("month")),
+        party=normalize_ws(request.args.get("party")),
+        domain=normalize_ws(request.args.get("domain")),        # used only to require subcat if provided
+        subcat=normalize_ws(request.args.get("subcategory")),
+        # type kept for backward compat but not used in folder mode
+    )
 
-    return jsonify({"results": results})
+    wants_ndjson = request.args.get("format") == "ndjson" or (
+        request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"])
+        == "application/x-ndjson"
+    )
+    dumps = app.json.dumps
+    if wants_ndjson:
+        return app.response_class(
+            (dumps(r) + "\n" for r in matches), mimetype="application/x-ndjson"
+        )
+
+    def json_chunks():
+        # same document jsonify would build, without holding every hit
+        yield '{"results":['
+        sep = ""
+        for r in matches:
+            yield sep + dumps(r)
+            sep = ","
+        yield "]}\n"
+
+    return app.response_class(json_chunks(), mimetype="application/json")
 
 # ---- delete-file --------------------------------
 
@@ -960,8 +1465,7 @@ def api_delete_file():
             return jsonify({"ok": False, "msg": "Missing 'path'"}), 400
 
         target = Path(raw).resolve(strict=True)
-        root = FS_ROOT.resolve()
-        if not str(target).startswith(str(root)):
+        if not is_within_root(target):
             return jsonify({"ok": False, "msg": "Not found"}), 404
         if not target.is_file():
             return jsonify({"ok": False, "msg": "Not a file"}), 400
@@ -1005,8 +1509,8 @@ def case_law_upload():
     except ValueError:
         return case_law_error("Decision year must be a number.")
 
-    current_year = datetime.now().year
-    if decision_year < 1800 or decision_year > current_year + 1:
+    now = datetime.now()
+    if decision_year < 1800 or decision_year > now.year + 1:
         return case_law_error("Decision year looks invalid.")
 
     decision_month = ""
@@ -1029,7 +1533,7 @@ def case_law_upload():
     if "." not in upload.filename:
         return case_law_error("The uploaded file must include an extension.")
 
-    ext = upload.filename.rsplit(".", 1)[1].lower()
+    ext = file_ext(upload.filename)
     if ext not in ALLOWED_EXTENSIONS:
         return case_law_error(f"File type '.{ext}' is not allowed.")
 
@@ -1054,16 +1558,13 @@ def case_law_upload():
     base_dir = case_law_root / primary_segment / type_segment / str(decision_year)
     base_dir.mkdir(parents=True, exist_ok=True)
 
+    # Everything is written under a hidden staging folder that is renamed to
+    # case_dir only once the row is in. list_dir skips staging folders, so
+    # browsing and search never see a half-written case, and a failed upload
+    # leaves nothing under its name.
     case_dir = ensure_unique_path(base_dir / safe_case_name)
-    case_dir.mkdir(exist_ok=False)
-
-    tmp_name = secure_filename(f"upload_{datetime.now().timestamp()}_{upload.filename}")
-    tmp_path = case_dir / tmp_name
-    upload.save(tmp_path)
-
-    target_file = case_dir / f"{safe_case_name}.{ext}"
-    target_file = ensure_unique_path(target_file)
-    tmp_path.rename(target_file)
+    staging_dir = ensure_unique_path(base_dir / f".{safe_case_name}.partial")
+    staging_dir.mkdir(exist_ok=False)
 
     note_payload = {
         "Petitioner": petitioner,
@@ -1073,17 +1574,25 @@ def case_law_upload():
         "Primary Type": primary,
         "Case Type": case_type,
         "Note": note_text,
-        "Saved At": datetime.now().isoformat(timespec="seconds"),
+        "Saved At": now.isoformat(timespec="seconds"),
     }
-    note_json = json.dumps(note_payload, indent=2)
+    note_json = _dumps_indented(note_payload)
 
+    target_file = case_dir / f"{safe_case_name}.{ext}"
     note_file = case_dir / "note.json"
-    note_file.write_text(note_json, encoding="utf-8")
+    try:
+        # staging_dir was just created empty, so the file name cannot be taken
+        with open(staging_dir / target_file.name, "xb") as out:
+            write_upload(upload, out)
+        (staging_dir / note_file.name).write_text(note_json, encoding="utf-8")
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
 
-    judgement_text = extract_text_for_index(target_file)
     folder_rel = str(case_dir.relative_to(FS_ROOT))
     note_rel = str(note_file.relative_to(FS_ROOT))
 
+    written_dir = staging_dir
     try:
         cur = conn.execute(
             """
@@ -1110,24 +1619,35 @@ def case_law_upload():
         refresh_case_law_index(
             conn,
             case_id,
-            judgement_text,
+            None,  # judgment text is filled in by the background indexer
             petitioner,
             respondent,
             citation,
             note_json,
         )
+        # rename before commit: a row is never committed without its folder
+        # (a racing upload that claimed case_dir first makes this fail)
+        staging_dir.rename(case_dir)
+        written_dir = case_dir
         conn.commit()
     except Exception as exc:
-        shutil.rmtree(case_dir, ignore_errors=True)
+        # drop the half-written row along with its folder instead of leaving
+        # the transaction open until teardown closes the connection
+        conn.rollback()
+        shutil.rmtree(written_dir, ignore_errors=True)
         raise exc
 
+    enqueue_case_law_text(str(_case_law_db_file()), case_id, target_file)
+
+    # 202: saved and searchable by metadata/note now, judgment text shortly
     return jsonify({
         "ok": True,
         "case_id": case_id,
         "folder": folder_rel,
         "file": target_file.name,
         "note": note_rel,
-    })
+        "indexing": "queued",
+    }), 202
 
 
 @app.get("/case-law/search")
@@ -1147,8 +1667,7 @@ def case_law_search():
         if not fts_query:
             return jsonify({"results": []})
         join_fts = True
-        where.append("c.id IN (SELECT rowid FROM case_law_fts WHERE case_law_fts MATCH ?)")
-        params.append(fts_query)
+        params.append(fts_query)  # bound by the "hits" CTE below
 
     party_raw = normalize_ws(request.args.get("party") or "")
     party_mode = normalize_ws(request.args.get("party_mode") or "either")
@@ -1220,7 +1739,17 @@ def case_law_search():
 
     select_fields.append("'' AS fts_content")
 
-    sql = "SELECT " + ", ".join(select_fields) + " FROM case_law c"
+    if join_fts:
+        # Run MATCH on its own first so the planner always drives the search
+        # from the FTS index, then join the hits back for the metadata filters.
+        sql = (
+            f"WITH hits AS {_CTE_MATERIALIZED}"
+            "(SELECT rowid FROM case_law_fts WHERE case_law_fts MATCH ?) "
+            "SELECT " + ", ".join(select_fields) +
+            " FROM hits JOIN case_law c ON c.id = hits.rowid"
+        )
+    else:
+        sql = "SELECT " + ", ".join(select_fields) + " FROM case_law c"
 
     if where:
         sql += " WHERE " + " AND ".join(where)
@@ -1262,7 +1791,7 @@ def case_law_download(case_id: int):
     if not file_path.exists():
         return "Not found", 404
 
-    return send_file(file_path, as_attachment=True)
+    return serve_file(file_path, as_attachment=True)
 
 
 @app.route("/case-law/<int:case_id>/note", methods=["GET", "POST"])
@@ -1295,18 +1824,21 @@ def case_law_note(case_id: int):
     note_path.parent.mkdir(parents=True, exist_ok=True)
     note_path.write_text(content, encoding="utf-8")
 
-    judgement_row = conn.execute("SELECT content FROM case_law_fts WHERE rowid = ?", (case_id,)).fetchone()
-    judgement_text = judgement_row["content"] if judgement_row else ""
-
-    refresh_case_law_index(
-        conn,
-        case_id,
-        judgement_text,
-        row["petitioner"],
-        row["respondent"],
-        row["citation"],
-        content,
-    )
+    # Only the note changed: update that column in place rather than reading
+    # the (possibly huge) judgment text back out just to re-insert it.
+    updated = conn.execute(
+        "UPDATE case_law_fts SET note = ? WHERE rowid = ?", (content, case_id)
+    ).rowcount
+    if not updated:
+        refresh_case_law_index(
+            conn,
+            case_id,
+            "",
+            row["petitioner"],
+            row["respondent"],
+            row["citation"],
+            content,
+        )
 
     conn.execute(
         "UPDATE case_law SET note_text = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
@@ -1334,19 +1866,21 @@ def api_dir_tree():
         if rel:
             base = (FS_ROOT / rel).resolve()
             # enforce FS_ROOT jail
-            if not str(base).startswith(str(FS_ROOT.resolve())):
+            if not is_within_root(base):
                 return jsonify({"dirs": [], "files": []})
-        if not base.exists() or not base.is_dir():
+        base_str = str(base)
+        if not os.path.isdir(base_str):
             return jsonify({"dirs": [], "files": []})
 
-        dirs = []
-        files = []
-        for entry in sorted(base.iterdir(), key=lambda p: p.name.lower()):
-            if entry.is_dir():
-                dirs.append(entry.name)
-            elif entry.is_file():
-                if "." in entry.name and entry.name.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS:
-                    files.append({"name": entry.name, "path": str(entry)})
+        # names straight from the (mtime-cached) scandir listing; no Path
+        # object or extra stat per entry
+        listing = list_dir(base_str)
+        dirs = sorted(listing.dirs + listing.linked_dirs, key=str.lower)
+        files = [
+            {"name": name, "path": os.path.join(base_str, name)}
+            for name in sorted(listing.files, key=str.lower)
+            if file_ext(name) in ALLOWED_EXTENSIONS
+        ]
         return jsonify({"dirs": dirs, "files": files})
     except Exception as e:
         return jsonify({"dirs": [], "files": [], "error": str(e)}), 500
@@ -1359,7 +1893,7 @@ def api_update_note(year, month, case_name):
     note_path = cdir / "Note.json"
 
     if not note_path.exists():
-        template = make_note_json({})
+        template = note_template()
         return jsonify({"ok": False, "msg": "Note.json not found", "template": template}), 404
 
     data = request.get_json(silent=True) or {}
@@ -1391,8 +1925,7 @@ def api_create_note():
         return jsonify({"ok": False, "msg": "Year, month, and case are required"}), 400
 
     cdir = (FS_ROOT / year / month / case).resolve()
-    root = FS_ROOT.resolve()
-    if not str(cdir).startswith(str(root)):
+    if not is_within_root(cdir):
         return jsonify({"ok": False, "msg": "Invalid path"}), 400
     if not cdir.exists():
         return jsonify({"ok": False, "msg": "Case folder not found"}), 404
@@ -1406,7 +1939,7 @@ def api_create_note():
     payload: Dict[str, Any] = {}
     if content.strip():
         try:
-            parsed = json.loads(content)
+            parsed = app.json.loads(content)
             if isinstance(parsed, dict):
                 payload = parsed
             else:
@@ -1426,12 +1959,12 @@ def api_note(year, month, case_name):
     cdir = FS_ROOT / year / month / case_name
     note_path = cdir / "Note.json"
     if not note_path.exists():
-        template = make_note_json({})
+        template = note_template()
         return jsonify({"ok": False, "msg": "Note.json not found", "template": template}), 404
 
     if request.method == "GET":
         content = note_path.read_text(encoding="utf-8")
-        return jsonify({"ok": True, "content": content, "template": make_note_json({})})
+        return jsonify({"ok": True, "content": content, "template": note_template()})
 
     data = request.get_json(silent=True) or {}
     content = data.get("content", "")
@@ -1444,7 +1977,8 @@ def api_note(year, month, case_name):
 
 
 # ---- Entrypoint ---------------------------------------------------------
-if __name__ == "__main__":
+def main() -> None:
+    """Run the built-in server (started via caseorg_server.py)."""
     ensure_root()
     print("\nURL map:")
     for r in app.url_map.iter_rules():
@@ -1452,3 +1986,7 @@ if __name__ == "__main__":
         print(f"  {r.rule:22s} [{methods}]")
     print()
     app.run(host="0.0.0.0", port=5000, debug=True)
+
+
+if __name__ == "__main__":
+    main()
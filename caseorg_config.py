@@ -1,61 +1,180 @@
+from contextlib import contextmanager
+from functools import cache
 from pathlib import Path
-import os, json
-
-# Where the JSON config is stored (can be overridden by env)
-CASEORG_CONFIG = Path(
-    os.environ.get(
-        "CASEORG_CONFIG",
-        os.path.join(
-            os.environ.get("XDG_CONFIG_HOME", str(Path.home() / ".config")),
-            "case-organizer",
-            "config.json",
-        ),
-    )
-)
+from types import MappingProxyType
+import os, json, tempfile
+
+try:
+    import orjson  # optional; much faster parse/serialize than stdlib json
+except ImportError:
+    orjson = None
+
+# Where the JSON config is stored (can be overridden by env). Computed on
+# first use so importing the module does no home-directory lookup.
+@cache
+def _config_path():
+    explicit = os.environ.get("CASEORG_CONFIG")
+    if explicit:
+        return Path(explicit)
+    # Only fall back to the home-directory lookup when XDG is unset
+    xdg = os.environ.get("XDG_CONFIG_HOME") or str(Path.home() / ".config")
+    return Path(xdg, "case-organizer", "config.json")
+
+@cache
+def _secret_key():
+    return os.environ.get("CASEORG_SECRET_KEY", "dev-local-secret-key")
+
+@cache
+def _pretty_output():
+    return os.environ.get("CASEORG_CONFIG_PRETTY") == "1"
+
+# Parsed config, keyed on (st_mtime_ns, st_size) of the file it came from.
+# "data" is a read-only view so the same object can be handed to every caller.
+_CACHE = {"stat": None, "data": None}
+_EMPTY = MappingProxyType({})
+
+def _stat_key():
+    st = os.stat(_config_path())
+    return (st.st_mtime_ns, st.st_size)
+
+def _read_bytes(path):
+    # Raw fd read: the file is tiny, so skip the buffered/text IO layers
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        # Ask for one byte more than the file size so the whole file
+        # normally comes back from a single short read
+        size = os.fstat(fd).st_size + 1
+        chunks = []
+        while True:
+            chunk = os.read(fd, size)
+            chunks.append(chunk)
+            if len(chunk) < size:
+                return b"".join(chunks)
+    finally:
+        os.close(fd)
 
 def _load():
+    """Return the parsed config; only re-reads the file when it changed on disk.
+
+    The result is a read-only mapping shared between callers; use
+    dict(_load()) to get a copy that can be modified and passed to _save().
+    """
     try:
-        with open(CASEORG_CONFIG, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+        key = _stat_key()
+    except OSError:
+        _CACHE["stat"] = _CACHE["data"] = None
+        return _EMPTY
+    if key == _CACHE["stat"]:
+        return _CACHE["data"]
+    try:
+        raw = _read_bytes(_config_path())
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except (OSError, ValueError):  # vanished/unreadable, or invalid JSON
+        return _EMPTY
+    if not isinstance(data, dict):
+        return _EMPTY
+    _CACHE["stat"], _CACHE["data"] = key, MappingProxyType(data)
+    return _CACHE["data"]
+
+_PARENT_READY = False
+
+def _ensure_parent(path):
+    # The config directory only needs creating once per process
+    global _PARENT_READY
+    if not _PARENT_READY:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _PARENT_READY = True
 
 def _save(obj):
-    CASEORG_CONFIG.parent.mkdir(parents=True, exist_ok=True)
-    with open(CASEORG_CONFIG, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2)
+    path = _config_path()
+    _ensure_parent(path)
+    # Compact by default; set CASEORG_CONFIG_PRETTY=1 for a hand-editable file
+    pretty = _pretty_output()
+    if orjson is not None:
+        raw = orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else None)
+    else:
+        raw = json.dumps(
+            obj,
+            indent=2 if pretty else None,
+            separators=None if pretty else (",", ":"),
+            ensure_ascii=False,
+        ).encode("utf-8")
+    # Write a uniquely named sibling temp file and rename it over the config,
+    # so readers never observe a truncated or half-written file and two
+    # processes saving at once never rename each other's partial writes.
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _CACHE["stat"], _CACHE["data"] = _stat_key(), MappingProxyType(obj)
 
-def save_fs_root(path_str):
-    data = _load()
-    data["FS_ROOT"] = path_str
+@contextmanager
+def _config_transaction():
+    """Yield a mutable copy of the config and save it once on clean exit."""
+    data = dict(_load())
+    yield data
     _save(data)
 
+def save_many(**fields):
+    """Merge several keys (e.g. FS_ROOT=..., ALLOWED_USERS=...) in one write.
+
+    Fields passed as None are left untouched.
+    """
+    with _config_transaction() as data:
+        data.update({k: v for k, v in fields.items() if v is not None})
+
+def save_fs_root(path_str):
+    save_many(FS_ROOT=path_str)
+
 def save_users(users_list):
-    data = _load()
-    data["ALLOWED_USERS"] = users_list
-    _save(data)
+    save_many(ALLOWED_USERS=users_list)
 
 def save_password(pw):
+    save_many(PASSWORD=pw)
+
+def get_config_state():
+    """(storage_ok, users_ok, password_ok) from a single _load()."""
     data = _load()
-    data["PASSWORD"] = pw
-    _save(data)
+    return (
+        bool(data.get("FS_ROOT")),
+        bool(data.get("ALLOWED_USERS")),
+        data.get("PASSWORD") not in (None, ""),
+    )
 
 def is_storage_configured():
-    return bool(_load().get("FS_ROOT"))
+    return get_config_state()[0]
 
 def is_users_configured():
-    return bool(_load().get("ALLOWED_USERS"))
+    return get_config_state()[1]
 
 def is_password_configured():
-    return _load().get("PASSWORD") not in (None, "")
+    return get_config_state()[2]
+
+# Expose live values for app.py. Resolved on attribute access (PEP 562) so
+# importing the module does no I/O and values track _save() writes.
+_LIVE_DEFAULTS = {"FS_ROOT": None, "PASSWORD": None}
 
-# Expose live values for app.py
-_cfg = _load()
-FS_ROOT = _cfg.get("FS_ROOT")
-ALLOWED_USERS = _cfg.get("ALLOWED_USERS", [])
-PASSWORD = _cfg.get("PASSWORD")
-SECRET_KEY = os.environ.get("CASEORG_SECRET_KEY", "dev-local-secret-key")
+def __getattr__(name):
+    if name == "ALLOWED_USERS":
+        # Read-only view of the list stored in the JSON
+        return tuple(_load().get("ALLOWED_USERS") or ())
+    if name in _LIVE_DEFAULTS:
+        return _load().get(name, _LIVE_DEFAULTS[name])
+    if name == "SECRET_KEY":
+        return _secret_key()
+    if name == "CASEORG_CONFIG":
+        return _config_path()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Extensions allowed at runtime
-ALLOWED_EXTENSIONS = {"pdf","docx","txt","png","jpg","jpeg","json"}
+ALLOWED_EXTENSIONS = frozenset({"pdf","docx","txt","png","jpg","jpeg","json"})
 
@@ -0,0 +1,31 @@
+# Judgment text extraction for the case-law search index.
+#
+# Lives in its own small module so that a job sent to an extraction worker
+# only pulls in this file and the extractor libraries. The worker still
+# re-runs the main script (spawn start method), so the service is launched
+# from caseorg_server.py, which imports the Flask app only when it is main.
+from pathlib import Path
+
+# Formats whose extraction is CPU-heavy enough to run in a worker process
+HEAVY_SUFFIXES = frozenset({".pdf", ".docx"})
+
+
+def extract_text(path: str) -> str:
+    file_path = Path(path)
+    suffix = file_path.suffix.lower()
+    try:
+        if suffix == ".pdf":
+            from pdfminer.high_level import extract_text as pdf_text  # type: ignore
+
+            # pdfminer lays out and releases one page at a time
+            return pdf_text(path)
+        if suffix == ".txt":
+            return file_path.read_text(encoding="utf-8", errors="ignore")
+        if suffix == ".docx":
+            from docx import Document  # type: ignore
+
+            doc = Document(path)
+            return "\n".join(p.text for p in doc.paragraphs)
+    except Exception as exc:
+        print(f"[case-law] Failed to extract text from {file_path}: {exc}")
+    return ""
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# Entry point for the Case Organizer server (systemd unit and
+# /usr/bin/case-organizer run this file).
+#
+# Judgment text extraction runs in "spawn" worker processes, and spawn
+# re-runs the main script in each worker as __mp_main__. Importing the app
+# only under the __main__ guard keeps workers from building a second Flask
+# app, re-reading the config and starting its thread pools.
+
+if __name__ == "__main__":
+    import app
+
+    app.main()